@@ -0,0 +1,377 @@
+"""
+Distributed batch analysis: one coordinator, any number of workers.
+
+The coordinator splits the input into work units (a chunk of FEN/EPD lines,
+or the mainline positions of one PGN game) and hands them out over TCP.
+Each worker drives its own local engine and streams one result per position
+back as soon as it is found. The coordinator writes the combined results as
+JSON lines.
+
+Protocol, one JSON object per line:
+    worker -> coordinator  {"type": "hello", "name": ...}
+    coordinator -> worker  {"type": "unit", "id": ..., "depth": ..., "lease": ..., "positions": [fen, ...]}
+    worker -> coordinator  {"type": "result", "id": ..., "index": ..., ...}
+    worker -> coordinator  {"type": "heartbeat", "id": ...}
+    worker -> coordinator  {"type": "done", "id": ...}
+    coordinator -> worker  {"type": "stop"}
+
+A unit is leased to one worker at a time. If the worker disconnects, or is
+silent (no result or heartbeat) for longer than the lease, the unit goes back
+to the queue and is retried up to MAX_ATTEMPTS times. Results already
+received for a unit are not written twice.
+
+    python sf.py coordinate positions.epd results.jsonl --listen 0.0.0.0:7000
+    python sf.py worker --connect coordinator-host:7000
+"""
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+from collections import deque
+
+import chess
+import chess.engine
+import chess.pgn
+
+DEFAULT_ENGINE = "bin/stockfish"
+DEFAULT_PORT = 7000
+UNIT_SIZE = 16  # FEN/EPD lines per work unit
+LEASE_SECONDS = 60
+MAX_ATTEMPTS = 3
+
+
+def parse_address(address):
+    """Split "host:port" (or just "host") into (host, port)"""
+    host, _, port = address.rpartition(":")
+    if not host:
+        return port or "127.0.0.1", DEFAULT_PORT
+    return host, int(port)
+
+
+def read_units(path, unit_size=UNIT_SIZE):
+    """Yield lists of FENs: one per PGN game, or unit_size lines of a FEN/EPD file"""
+    if path.lower().endswith(".pgn"):
+        with open(path) as f:
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    return
+                board = game.board()
+                fens = [board.fen()]
+                for move in game.mainline_moves():
+                    board.push(move)
+                    fens.append(board.fen())
+                yield fens
+    else:
+        unit = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    board = chess.Board(line)
+                except ValueError:  # EPD: four position fields plus opcodes
+                    board, _ = chess.Board.from_epd(line)
+                unit.append(board.fen())
+                if len(unit) == unit_size:
+                    yield unit
+                    unit = []
+        if unit:
+            yield unit
+
+
+def score_to_json(score):
+    """White-relative {"cp": ...} or {"mate": ...} for a PovScore"""
+    white = score.white()
+    if white.is_mate():
+        return {"mate": white.mate()}
+    return {"cp": white.score()}
+
+
+def _send(sock_file, lock, message):
+    with lock:
+        sock_file.write(json.dumps(message) + "\n")
+        sock_file.flush()
+
+
+class _Work:
+    """Shared coordinator state: queued, leased and finished units
+
+    Units are pulled from the input as workers ask for them; only leased and
+    requeued units are kept in memory.
+    """
+
+    def __init__(self, units, depth, output):
+        self.source = enumerate(units)
+        self.exhausted = False
+        self.error = None  # Exception that ended reading the input early
+        self.units = {}  # unit id -> positions, while leased or requeued
+        self.attempts = {}
+        self.queue = deque()  # Requeued unit ids
+        self.leased = set()
+        self.finished = 0
+        self.failed = set()
+        self.seen = {}  # unit id -> indexes already written, while the unit is live
+        self.workers = 0  # Connected workers
+        self.depth = depth
+        self.output = output
+        self.cond = threading.Condition()
+
+    def _next_unit(self):
+        """Read the next unit from the input; None once it is exhausted"""
+        try:
+            unit_id, positions = next(self.source)
+        except StopIteration:
+            self.exhausted = True
+            return None
+        except (OSError, ValueError) as e:
+            print(f"reading input failed: {e}", file=sys.stderr)
+            self.exhausted = True
+            self.error = e
+            return None
+        self.units[unit_id] = positions
+        self.attempts[unit_id] = 0
+        return unit_id
+
+    def lease(self):
+        """Block until a unit is available and return (id, positions); None once every unit has finished"""
+        with self.cond:
+            while True:
+                if self.queue:
+                    unit_id = self.queue.popleft()
+                    break
+                if not self.exhausted:
+                    unit_id = self._next_unit()
+                    if unit_id is not None:
+                        break
+                    continue
+                if not self.leased:
+                    self.cond.notify_all()
+                    return None
+                self.cond.wait()
+            self.attempts[unit_id] += 1
+            self.leased.add(unit_id)
+            return unit_id, self.units[unit_id]
+
+    def done(self):
+        with self.cond:
+            return self.exhausted and not self.queue and not self.leased
+
+    def release(self, unit_id):
+        """Return a unit whose worker was lost, or give up on it"""
+        with self.cond:
+            self.leased.discard(unit_id)
+            if self.attempts[unit_id] < MAX_ATTEMPTS:
+                self.queue.append(unit_id)
+            else:
+                self.failed.add(unit_id)
+                self._forget(unit_id)
+                print(f"unit {unit_id} failed after {MAX_ATTEMPTS} attempts", file=sys.stderr)
+            self.cond.notify_all()
+
+    def complete(self, unit_id):
+        with self.cond:
+            self.leased.discard(unit_id)
+            self.finished += 1
+            self._forget(unit_id)
+            self.cond.notify_all()
+
+    def _forget(self, unit_id):
+        del self.units[unit_id]
+        del self.attempts[unit_id]
+        self.seen.pop(unit_id, None)
+
+    def add_result(self, message):
+        unit_id, index = message["id"], message["index"]
+        with self.cond:
+            seen = self.seen.setdefault(unit_id, set())
+            if index in seen:
+                return
+            seen.add(index)
+            message = dict(message, unit=message.pop("id"))
+            del message["type"]
+            self.output.write(json.dumps(message) + "\n")
+            self.output.flush()
+
+    def connected(self, delta):
+        with self.cond:
+            self.workers += delta
+            self.cond.notify_all()
+
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+    """One connected worker: lease units to it until the work runs out"""
+
+    def handle(self):
+        work = self.server.work
+        self.request.settimeout(self.server.lease_seconds)
+        self.wfile_lock = threading.Lock()
+
+        try:
+            hello = json.loads(self.rfile.readline())
+            name = hello.get("name", self.client_address)
+        except (OSError, ValueError, AttributeError):
+            return
+
+        work.connected(1)
+        try:
+            self._serve(work, name)
+        finally:
+            work.connected(-1)
+
+    def _serve(self, work, name):
+        while True:
+            leased = work.lease()
+            if leased is None:
+                self._send({"type": "stop"})
+                return
+            unit_id, positions = leased
+            completed = False
+            try:
+                self._send({"type": "unit", "id": unit_id, "depth": work.depth,
+                            "lease": self.server.lease_seconds, "positions": positions})
+                self._run_unit(work, unit_id)
+                completed = True
+            except (OSError, ValueError) as e:
+                print(f"worker {name} lost on unit {unit_id}: {e or type(e).__name__}", file=sys.stderr)
+                return
+            finally:
+                # Whatever ends the connection, the unit must not stay leased
+                if completed:
+                    work.complete(unit_id)
+                else:
+                    work.release(unit_id)
+
+    def _run_unit(self, work, unit_id):
+        """Read results until the worker reports the unit done
+
+        Malformed or unexpected messages raise ValueError, which drops the
+        worker like a lost connection.
+        """
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                raise ConnectionError("connection closed")
+            message = json.loads(line)
+            kind = message.get("type") if isinstance(message, dict) else None
+            if kind == "result" and message.get("id") == unit_id and isinstance(message.get("index"), int):
+                work.add_result(message)
+            elif kind == "done":
+                return
+            elif kind != "heartbeat":
+                raise ValueError(f"protocol error: {line.decode(errors='replace').strip()[:80]!r}")
+
+    def _send(self, message):
+        with self.wfile_lock:
+            self.wfile.write((json.dumps(message) + "\n").encode())
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def run_coordinator(input_path, output_path, listen="127.0.0.1:7000", depth=15,
+                    unit_size=UNIT_SIZE, lease_seconds=LEASE_SECONDS, local_workers=0, engine=DEFAULT_ENGINE):
+    """Serve the work units in input_path to workers and write results to output_path"""
+    host, port = parse_address(listen)
+    with open(output_path, "w") as output:
+        work = _Work(read_units(input_path, unit_size), depth, output)
+        server = _Server((host, port), _WorkerHandler)
+        server.work = work
+        server.lease_seconds = lease_seconds
+        host, port = server.server_address[:2]
+        print(f"coordinator on {host}:{port}", file=sys.stderr)
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        sf = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sf.py")
+        workers = [subprocess.Popen([sys.executable, sf, "worker", "--connect", f"{host}:{port}",
+                                     "--engine", engine])
+                   for _ in range(local_workers)]
+        stranded = False
+        try:
+            with work.cond:
+                while not work.done():
+                    # Local workers that all died (e.g. no engine) would leave us waiting forever
+                    if workers and work.workers == 0 and all(proc.poll() is not None for proc in workers):
+                        print("every local worker has exited and no worker is connected", file=sys.stderr)
+                        stranded = True
+                        break
+                    work.cond.wait(timeout=1)
+        finally:
+            server.shutdown()
+            server.server_close()
+            for proc in workers:
+                proc.wait()
+
+    print(f"{work.finished} units done, {len(work.failed)} failed", file=sys.stderr)
+    return 1 if work.failed or work.error or stranded else 0
+
+
+def run_worker(connect, engine_path=DEFAULT_ENGINE):
+    """Connect to a coordinator and analyse units with a local engine until told to stop"""
+    try:
+        engine = chess.engine.SimpleEngine.popen_uci(engine_path)
+    except (OSError, chess.engine.EngineError) as e:
+        print(f"cannot start engine {engine_path}: {e}", file=sys.stderr)
+        return 1
+    try:
+        sock = socket.create_connection(parse_address(connect))
+    except OSError as e:
+        print(f"cannot connect to {connect}: {e}", file=sys.stderr)
+        engine.quit()
+        return 1
+    rfile = sock.makefile("r")
+    wfile = sock.makefile("w")
+    lock = threading.Lock()
+    current = [None]  # Unit being analysed, for the heartbeat thread
+    stopped = threading.Event()
+
+    def heartbeat(lease):
+        # Three heartbeats per lease keep a slow search from losing its unit
+        while not stopped.wait(lease / 3):
+            if current[0] is not None:
+                try:
+                    _send(wfile, lock, {"type": "heartbeat", "id": current[0]})
+                except OSError:
+                    return
+
+    heartbeat_thread = None
+    try:
+        _send(wfile, lock, {"type": "hello", "name": f"{socket.gethostname()}:{os.getpid()}"})
+        for line in rfile:
+            message = json.loads(line)
+            if message["type"] == "stop":
+                break
+            unit_id = current[0] = message["id"]
+            if heartbeat_thread is None:
+                # The lease comes with the first unit; start beating only now
+                heartbeat_thread = threading.Thread(
+                    target=heartbeat, args=(message.get("lease", LEASE_SECONDS),), daemon=True
+                )
+                heartbeat_thread.start()
+            limit = chess.engine.Limit(depth=message["depth"])
+            for index, fen in enumerate(message["positions"]):
+                info = engine.analyse(chess.Board(fen), limit)
+                pv = info.get("pv", [])
+                result = {"type": "result", "id": unit_id, "index": index, "fen": fen,
+                          "depth": info.get("depth"), "bestmove": pv[0].uci() if pv else None,
+                          "pv": [m.uci() for m in pv]}
+                if "score" in info:
+                    result.update(score_to_json(info["score"]))
+                _send(wfile, lock, result)
+            _send(wfile, lock, {"type": "done", "id": unit_id})
+            current[0] = None
+    except OSError as e:
+        # The coordinator dropped us (e.g. the lease expired); it requeues the unit
+        print(f"lost connection to coordinator: {e or type(e).__name__}", file=sys.stderr)
+        return 1
+    finally:
+        stopped.set()
+        engine.quit()
+        sock.close()
+    return 0
@@ -0,0 +1,1360 @@
+"""
+Tkinter GUI for Stockfish, started by sf.py.
+
+Features:
+- Click source then destination to make a move
+- Visual feedback for legal moves
+- "Engine Move" asks Stockfish for a best move
+- "Analyze" runs one MultiPV search and streams the top lines, with arrows
+  for their first moves; clicking a line previews it on the board
+- New Game, Back/Forward through a variation tree, Flip Board
+- Load/Save FEN and PGN support (including variations)
+- Opening explorer over a position index built from PGN databases
+  (python sf.py index games.pgn games.idx)
+- Optional UCI session recording and offline replay
+  (python sf.py --record-uci session.uci / --replay-uci session.uci)
+
+Startup only imports what the first paint of the board needs. chess.pgn
+(which pulls in chess.engine and asyncio), the file dialogs, Pillow and
+the explorer index are imported after the window is up or on first use.
+"""
+import os
+import threading
+import time
+import tkinter as tk
+from tkinter import messagebox
+import shutil
+from collections import OrderedDict
+import chess
+import chess.polyglot
+from datetime import datetime
+
+# === Configuration ===
+DEFAULT_ENGINE = "bin/stockfish"
+
+SQUARE_SIZE = 64  # Initial square size; the board scales with the window
+MIN_SQUARE_SIZE = 24
+EVAL_BAR_WIDTH = 30  # Eval bar width at SQUARE_SIZE, scaled with the board
+RESIZE_DEBOUNCE_MS = 60
+PIECE_CACHE_SIZES = 4  # Number of square sizes whose piece images are kept
+HISTORY_PLIES = 150  # Move history kept per position; the 75-move rule ends any game first
+BOARD_COLOR_1 = "#EEEED2"
+BOARD_COLOR_2 = "#769656"
+HIGHLIGHT_COLOR = "#BACA44"
+LEGAL_MOVE_COLOR = "#90EE90"
+LAST_MOVE_COLOR = "#CDD26A"
+PIECE_FONT = ("DejaVu Sans", 40)
+# Fonts with the chess glyphs (U+2654-U+265F) for pre-rendered pieces:
+# Linux, Windows and macOS. Pillow searches the system font folders.
+PIECE_FONT_FILES = ("DejaVuSans.ttf", "seguisym.ttf", "Apple Symbols.ttf", "FreeSerif.ttf")
+
+# MultiPV analysis panel
+MULTIPV_LINES = 3  # Default number of lines searched by "Analyze"
+PV_SAN_PLIES = 10  # Plies of each line shown and previewed
+ANALYSIS_UPDATE_MS = 150  # Minimum time between streamed panel updates
+ARROW_COLORS = ["#15781B", "#2F6FB0", "#B07A2F", "#8A3FA0"]  # Best line first
+
+# Eval bar colors
+EVAL_WHITE_COLOR = "#E0E0E0"
+EVAL_BLACK_COLOR = "#000000"
+EVAL_TEXT_COLOR = "#888888"
+
+UNICODE_PIECES = {
+    'P': '♙', 'N': '♘', 'B': '♗', 'R': '♖', 'Q': '♕', 'K': '♔',
+    'p': '♟', 'n': '♞', 'b': '♝', 'r': '♜', 'q': '♛', 'k': '♚'
+}
+
+
+class PieceImageCache:
+    """Piece images pre-rendered once per square size, LRU-bounded across sizes"""
+
+    def __init__(self, master, max_sizes=PIECE_CACHE_SIZES):
+        self.master = master
+        self.max_sizes = max_sizes
+        self._sizes = OrderedDict()  # square size -> {symbol: PhotoImage}
+        self._pil = None  # Pillow modules, imported on first use; False if missing
+
+    def get(self, size):
+        """Return {symbol: PhotoImage} for size, or None without Pillow or a chess font"""
+        if self._pil is None:
+            try:
+                from PIL import Image, ImageDraw, ImageFont, ImageTk
+                self._pil = (Image, ImageDraw, ImageFont, ImageTk)
+            except ImportError:  # Pillow is optional; pieces fall back to canvas text
+                self._pil = False
+        if not self._pil:
+            return None
+
+        images = self._sizes.get(size)
+        if images is None:
+            images = self._render(size)
+            if images is None:  # No font with chess glyphs; Tk's font fallback can draw them
+                self._pil = False
+                return None
+            self._sizes[size] = images
+            if len(self._sizes) > self.max_sizes:
+                self._sizes.popitem(last=False)
+        else:
+            self._sizes.move_to_end(size)
+        return images
+
+    def _render(self, size):
+        """Rasterize all piece glyphs for one square size; None if no font has them"""
+        Image, ImageDraw, ImageFont, ImageTk = self._pil
+        font = self._chess_font(ImageFont, size * PIECE_FONT[1] // SQUARE_SIZE)
+        if font is None:
+            return None
+
+        images = {}
+        for symbol, glyph in UNICODE_PIECES.items():
+            img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+            ImageDraw.Draw(img).text((size / 2, size / 2), glyph, font=font, fill="black", anchor="mm")
+            images[symbol] = ImageTk.PhotoImage(img, master=self.master)
+        return images
+
+    @staticmethod
+    def _chess_font(ImageFont, font_size):
+        """First of PIECE_FONT_FILES that is installed and really has the chess glyphs"""
+        for name in PIECE_FONT_FILES:
+            try:
+                font = ImageFont.truetype(name, font_size)
+            except OSError:
+                continue
+            # A font without the glyphs draws every piece as the same box
+            king, knight = (list(font.getmask(UNICODE_PIECES[s])) for s in "Kn")
+            if king != knight:
+                return font
+        return None
+
+
+class StockfishGUI(tk.Tk):
+    def __init__(self, engine_path=DEFAULT_ENGINE, record_uci=None, replay_uci=None):
+        super().__init__()
+        self.title("Stockfish GUI")
+        self.engine_path = engine_path
+        self.record_uci = record_uci  # Log every UCI line of the session to this file
+        self.replay_uci = replay_uci  # Play this recording back instead of running an engine
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Set background color
+        self.configure(bg="#808080")
+
+        # Chess state
+        # The game is a tree of chess.pgn nodes; self.node is the current
+        # position and self.board is its (never mutated) cached board. The
+        # tree is created in _finish_startup, after the first paint.
+        self.game = None
+        self.node = None
+        self.node_boards = {}  # node -> board snapshot
+        self.position_evals = {}  # position key -> (score, depth) from the engine
+        self.board = chess.Board()
+        self.board_key = chess.polyglot.zobrist_hash(self.board)
+        self.selected = None
+        self.last_move = None
+        self.flipped = False
+        self.square_size = SQUARE_SIZE
+        self.eval_bar_width = EVAL_BAR_WIDTH
+        self.piece_images = PieceImageCache(self)
+        self._resize_job = None
+        self.engine = None
+        self.engine_thinking = False
+        self.current_eval = None  # Stores current evaluation
+        self.position_index = None  # Opening explorer database
+        self._explorer_board = None  # Board the explorer panel was filled for
+        self.multipv_key = None  # Position the MultiPV lines belong to
+        self.multipv_lines = []  # [(score, pv, depth)] from the last "Analyze"
+        self.preview = None  # Board shown while previewing a MultiPV line
+        self._analysis_stop = None  # Set to stop a streaming analysis early
+        self.auto_analyze = tk.BooleanVar(value=True)  # Auto-analysis toggle
+        self.panels_ready = False
+        self.move_labels = {}  # node -> (turn, fullmove number, SAN) of its move, for the move list
+        self._move_list_dirty = True  # The game tree changed since the move list was built
+        self._move_list_node = None  # Node highlighted in the move list
+
+        # UI Setup: paint the board first, build everything else once the
+        # board is on screen
+        self._setup_board()
+        self.draw_board()
+        self._expose_binding = self.canvas.bind("<Expose>", self._on_first_expose, add="+")
+
+    def _on_first_expose(self, event):
+        """Wait for the canvas to redraw itself (at idle) after it is first shown"""
+        self.canvas.unbind("<Expose>", self._expose_binding)
+        self.after_idle(self._on_first_paint)
+
+    def _on_first_paint(self):
+        """The board is drawn; build the rest once the frame has been flushed"""
+        self.event_generate("<<FirstPaint>>")
+        self.after(0, self._finish_startup)
+
+    def _finish_startup(self):
+        """Create the game tree and the secondary panels after the first paint"""
+        import chess.pgn
+
+        self.game = chess.pgn.Game()
+        self.node = self.game
+        self.node_boards[self.game] = self.board
+        self._setup_panels()
+        self.panels_ready = True
+        self.draw_board()
+        self.after_idle(self.event_generate, "<<StartupDone>>")
+
+    def _setup_board(self):
+        """Initialize the board and eval bar"""
+        # Main container for board and eval bar; it takes all spare window
+        # space and the board inside is centered and scaled to fit
+        self.grid_rowconfigure(0, weight=1)
+        for col in range(6):
+            self.grid_columnconfigure(col, weight=1)
+        board_frame = tk.Frame(
+            self,
+            bg="#E0E0E0",
+            width=EVAL_BAR_WIDTH + 5 + SQUARE_SIZE*8,
+            height=SQUARE_SIZE*8
+        )
+        board_frame.grid(row=0, column=0, columnspan=6, padx=5, pady=5, sticky="nsew")
+        board_frame.bind("<Configure>", self._on_board_configure)
+        board_inner = tk.Frame(board_frame, bg="#E0E0E0")
+        board_inner.place(relx=0.5, rely=0.5, anchor="center")
+        
+        # Eval bar canvas (left side)
+        self.eval_canvas = tk.Canvas(
+            board_inner,
+            width=EVAL_BAR_WIDTH,
+            height=SQUARE_SIZE*8,
+            highlightthickness=0,
+            bg="#E0E0E0"
+        )
+        self.eval_canvas.pack(side=tk.LEFT, padx=(0, 5))
+        
+        # Main board canvas
+        self.canvas = tk.Canvas(
+            board_inner, 
+            width=SQUARE_SIZE*8, 
+            height=SQUARE_SIZE*8,
+            highlightthickness=0
+        )
+        self.canvas.pack(side=tk.LEFT)
+
+    def _setup_panels(self):
+        """Initialize buttons, settings, status bar, move list and explorer"""
+        self.canvas.bind("<Button-1>", self.on_click)
+
+        # Control buttons row 1
+        btn_frame1 = tk.Frame(self, bg="#E0E0E0")
+        btn_frame1.grid(row=1, column=0, columnspan=6, pady=5)
+        
+        tk.Button(btn_frame1, text="Engine Move", command=self.do_engine_move, width=12).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_frame1, text="Analyze", command=self.do_analyze, width=12).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_frame1, text="New Game", command=self.new_game, width=12).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_frame1, text="◀ Back", command=self.go_back, width=12).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_frame1, text="Forward ▶", command=self.go_forward, width=12).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_frame1, text="Flip Board", command=self.flip_board, width=12).pack(side=tk.LEFT, padx=2)
+
+        # Control buttons row 2
+        btn_frame2 = tk.Frame(self, bg="#E0E0E0")
+        btn_frame2.grid(row=2, column=0, columnspan=6, pady=5)
+        
+        tk.Button(btn_frame2, text="Load FEN", command=self.load_fen, width=12).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_frame2, text="Save FEN", command=self.save_fen, width=12).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_frame2, text="Load PGN", command=self.load_pgn, width=12).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_frame2, text="Save PGN", command=self.save_pgn, width=12).pack(side=tk.LEFT, padx=2)
+        tk.Button(btn_frame2, text="Open Index", command=self.open_index, width=12).pack(side=tk.LEFT, padx=2)
+
+        # Engine settings
+        settings_frame = tk.Frame(self, bg="#E0E0E0")
+        settings_frame.grid(row=3, column=0, columnspan=6, pady=5)
+        
+        tk.Label(settings_frame, text="Depth:", bg="#E0E0E0").pack(side=tk.LEFT, padx=2)
+        self.depth_var = tk.IntVar(value=18)
+        tk.Spinbox(settings_frame, from_=1, to=40, textvariable=self.depth_var, width=5).pack(side=tk.LEFT, padx=2)
+
+        tk.Label(settings_frame, text="Lines:", bg="#E0E0E0").pack(side=tk.LEFT, padx=(10, 2))
+        self.multipv_var = tk.IntVar(value=MULTIPV_LINES)
+        tk.Spinbox(settings_frame, from_=1, to=len(ARROW_COLORS) * 2, textvariable=self.multipv_var,
+                   width=3).pack(side=tk.LEFT, padx=2)
+        
+        tk.Checkbutton(settings_frame, text="Auto-Analyze", variable=self.auto_analyze, 
+                      bg="#E0E0E0", command=self.toggle_auto_analyze).pack(side=tk.LEFT, padx=10)
+        
+        tk.Label(settings_frame, text="Engine:", bg="#E0E0E0").pack(side=tk.LEFT, padx=(10, 2))
+        self.engine_entry = tk.Entry(settings_frame, width=30)
+        self.engine_entry.pack(side=tk.LEFT, padx=2)
+        self.engine_entry.insert(0, self.engine_path)
+        tk.Button(settings_frame, text="Set Path", command=self.set_engine_path).pack(side=tk.LEFT, padx=2)
+
+        # Status bar
+        self.status = tk.StringVar(value="Ready")
+        status_label = tk.Label(self, textvariable=self.status, anchor="w", relief=tk.SUNKEN, bd=1, bg="#F0F0F0")
+        status_label.grid(row=4, column=0, columnspan=6, sticky="we", padx=5, pady=5)
+
+        # MultiPV analysis lines
+        analysis_frame = tk.Frame(self, bg="#E0E0E0")
+        analysis_frame.grid(row=5, column=0, columnspan=6, sticky="nsew", padx=5, pady=5)
+
+        tk.Label(analysis_frame, text="Analysis:", bg="#E0E0E0").pack(anchor="w")
+
+        self.analysis_text = tk.Text(analysis_frame, height=4, width=60, wrap=tk.NONE)
+        self.analysis_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        scrollbar = tk.Scrollbar(analysis_frame, command=self.analysis_text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.analysis_text.config(yscrollcommand=scrollbar.set)
+
+        # Move list
+        move_frame = tk.Frame(self, bg="#E0E0E0")
+        move_frame.grid(row=6, column=0, columnspan=6, sticky="nsew", padx=5, pady=5)
+        
+        tk.Label(move_frame, text="Moves:", bg="#E0E0E0").pack(anchor="w")
+        
+        self.move_text = tk.Text(move_frame, height=6, width=60, wrap=tk.WORD)
+        self.move_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        scrollbar = tk.Scrollbar(move_frame, command=self.move_text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.move_text.config(yscrollcommand=scrollbar.set)
+        self.move_text.tag_configure("active_move", background=HIGHLIGHT_COLOR)
+        self.move_text.tag_configure("variation", foreground="#555555")
+
+        # Opening explorer
+        explorer_frame = tk.Frame(self, bg="#E0E0E0")
+        explorer_frame.grid(row=7, column=0, columnspan=6, sticky="nsew", padx=5, pady=5)
+
+        tk.Label(explorer_frame, text="Explorer:", bg="#E0E0E0").pack(anchor="w")
+
+        self.explorer_text = tk.Text(explorer_frame, height=6, width=60, wrap=tk.NONE)
+        self.explorer_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        scrollbar = tk.Scrollbar(explorer_frame, command=self.explorer_text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.explorer_text.config(yscrollcommand=scrollbar.set)
+
+        # Navigation hotkeys
+        self.bind("<Left>", lambda e: self._navigation_key(e, self.go_back))
+        self.bind("<Right>", lambda e: self._navigation_key(e, self.go_forward))
+        self.bind("<Home>", lambda e: self._navigation_key(e, lambda: self.go_to_node(self.game)))
+        self.bind("<End>", lambda e: self._navigation_key(e, lambda: self.go_to_node(self.node.end())))
+        self.bind("<Escape>", lambda e: self._end_preview())
+
+    def _navigation_key(self, event, action):
+        """Run a navigation hotkey unless it was meant for a text field's cursor"""
+        # Every widget inherits the toplevel's bindings
+        if not isinstance(event.widget, (tk.Entry, tk.Spinbox)):
+            action()
+
+    def _on_board_configure(self, event):
+        """Debounce live window resizes into a single re-layout"""
+        if self._resize_job is not None:
+            self.after_cancel(self._resize_job)
+        self._resize_job = self.after(RESIZE_DEBOUNCE_MS, self._apply_resize, event.width, event.height)
+
+    def _apply_resize(self, width, height):
+        """Scale the board and eval bar to fit the available space"""
+        self._resize_job = None
+        fit_width = int((width - 5) / (8 + EVAL_BAR_WIDTH / SQUARE_SIZE))
+        size = max(MIN_SQUARE_SIZE, min(fit_width, height // 8))
+        if size == self.square_size:
+            return
+
+        self.square_size = size
+        self.eval_bar_width = size * EVAL_BAR_WIDTH // SQUARE_SIZE
+        self.eval_canvas.config(width=self.eval_bar_width, height=size*8)
+        self.canvas.config(width=size*8, height=size*8)
+        self.draw_board()
+
+    def draw_board(self):
+        """Redraw the entire board"""
+        self.canvas.delete("all")
+        board = self.preview or self.board
+        
+        # Draw squares
+        for r in range(8):
+            for c in range(8):
+                self._draw_square(c, r)
+        
+        # Highlight last move
+        last_move = board.peek() if self.preview else self.last_move
+        if last_move:
+            self._highlight_square(chess.square_file(last_move.from_square), 
+                                  chess.square_rank(last_move.from_square), 
+                                  LAST_MOVE_COLOR)
+            self._highlight_square(chess.square_file(last_move.to_square), 
+                                  chess.square_rank(last_move.to_square), 
+                                  LAST_MOVE_COLOR)
+        
+        # Highlight selected square and legal moves
+        if self.selected is not None:
+            c, r = self.selected
+            self._highlight_square(c, r, HIGHLIGHT_COLOR)
+            self._show_legal_moves(c, r)
+        
+        # Draw pieces
+        for sq in chess.SQUARES:
+            piece = board.piece_at(sq)
+            if piece:
+                file = chess.square_file(sq)
+                rank = chess.square_rank(sq)
+                self._draw_piece(file, rank, piece)
+        
+        # Best move arrows from the MultiPV analysis
+        self._draw_arrows()
+        
+        # Update eval bar
+        self._draw_eval_bar()
+        
+        if not self.panels_ready:
+            return
+
+        # Update move list
+        self._update_move_list()
+        
+        # Update opening explorer
+        self._update_explorer()
+        
+        # Update status
+        self._update_status()
+
+    def _draw_square(self, c, r):
+        """Draw a single square on the board"""
+        x0, y0 = self._get_screen_coords(c, r)
+        color = BOARD_COLOR_1 if (r + c) % 2 == 0 else BOARD_COLOR_2
+        self.canvas.create_rectangle(
+            x0, y0, x0 + self.square_size, y0 + self.square_size, 
+            fill=color, outline="", tags="square"
+        )
+
+    def _highlight_square(self, c, r, color):
+        """Highlight a square with the given color"""
+        x0, y0 = self._get_screen_coords(c, r)
+        self.canvas.create_rectangle(
+            x0, y0, x0 + self.square_size, y0 + self.square_size,
+            outline=color, width=4, tags="highlight"
+        )
+
+    def _show_legal_moves(self, c, r):
+        """Show legal move indicators for selected piece"""
+        src = chess.square(c, r)
+        for move in self.board.legal_moves:
+            if move.from_square == src:
+                dest_file = chess.square_file(move.to_square)
+                dest_rank = chess.square_rank(move.to_square)
+                x0, y0 = self._get_screen_coords(dest_file, dest_rank)
+                
+                # Draw circle for legal moves
+                center_x = x0 + self.square_size // 2
+                center_y = y0 + self.square_size // 2
+                radius = self.square_size // 8
+                
+                # Check if this is a capture (including en passant)
+                is_capture = self.board.is_capture(move)
+                
+                if is_capture:
+                    # Capture indicator (ring around edge)
+                    self.canvas.create_oval(
+                        x0 + 2, y0 + 2, x0 + self.square_size - 2, y0 + self.square_size - 2,
+                        outline=LEGAL_MOVE_COLOR, width=4, tags="legal"
+                    )
+                else:
+                    # Normal move indicator (small circle)
+                    self.canvas.create_oval(
+                        center_x - radius, center_y - radius,
+                        center_x + radius, center_y + radius,
+                        fill=LEGAL_MOVE_COLOR, outline="", tags="legal"
+                    )
+
+    def _draw_piece(self, file, rank, piece):
+        """Draw a piece on the board"""
+        x0, y0 = self._get_screen_coords(file, rank)
+        x = x0 + self.square_size // 2
+        y = y0 + self.square_size // 2
+        # Pillow is only loaded once startup has finished
+        images = self.piece_images.get(self.square_size) if self.panels_ready else None
+        if images is not None:
+            self.canvas.create_image(x, y, image=images[piece.symbol()], tags="piece")
+            return
+
+        font = (PIECE_FONT[0], self.square_size * PIECE_FONT[1] // SQUARE_SIZE)
+        text = UNICODE_PIECES[piece.symbol()]
+        self.canvas.create_text(x, y, text=text, font=font, tags="piece")
+
+    def _draw_arrows(self):
+        """Draw an arrow for the first move of each MultiPV line, best on top"""
+        self.canvas.delete("arrow")
+        if self.preview or self.multipv_key != self.board_key:
+            return
+
+        sq = self.square_size
+        for i, (_, pv, _) in reversed(list(enumerate(self.multipv_lines))):
+            move = pv[0]
+            x0, y0 = self._get_screen_coords(chess.square_file(move.from_square), chess.square_rank(move.from_square))
+            x1, y1 = self._get_screen_coords(chess.square_file(move.to_square), chess.square_rank(move.to_square))
+            width = max(2, sq // (8 if i == 0 else 12))
+            self.canvas.create_line(
+                x0 + sq // 2, y0 + sq // 2, x1 + sq // 2, y1 + sq // 2,
+                fill=ARROW_COLORS[i % len(ARROW_COLORS)], width=width,
+                arrow=tk.LAST, arrowshape=(width * 2, width * 2.5, width), tags="arrow"
+            )
+
+    def _get_screen_coords(self, file, rank):
+        """Convert board coordinates to screen coordinates"""
+        if self.flipped:
+            x0 = (7 - file) * self.square_size
+            y0 = rank * self.square_size
+        else:
+            x0 = file * self.square_size
+            y0 = (7 - rank) * self.square_size
+        return x0, y0
+
+    def _get_board_coords(self, x, y):
+        """Convert screen coordinates to board coordinates"""
+        c = x // self.square_size
+        r = 7 - (y // self.square_size)
+        
+        if self.flipped:
+            c = 7 - c
+            r = 7 - r
+        
+        if 0 <= c < 8 and 0 <= r < 8:
+            return c, r
+        return None
+
+    def _update_move_list(self):
+        """Rebuild the move list if the tree changed; otherwise only move the highlight"""
+        if self._move_list_dirty:
+            self._move_list_dirty = False
+            self._move_list_node = None
+            self.move_text.delete(1.0, tk.END)
+            for tag in self.move_text.tag_names():
+                if tag.startswith("node"):
+                    self.move_text.tag_delete(tag)
+
+            if not self.game.variations:
+                self.move_text.insert(tk.END, "No moves yet.")
+            else:
+                self._insert_line(self.game, 0, True)
+
+        if self.node is self._move_list_node:
+            return
+        self._move_list_node = self.node
+        self.move_text.tag_remove("active_move", 1.0, tk.END)
+        if self.node is self.game:
+            self.move_text.see(tk.END)
+            return
+        tag = f"node{id(self.node)}"
+        self.move_text.tag_add("active_move", f"{tag}.first", f"{tag}.last")
+        self.move_text.see(f"{tag}.first")
+
+    def _insert_line(self, node, level, first=False):
+        """Insert the line following node, with side variations in parentheses"""
+        while node.variations:
+            main = node.variations[0]
+            self._insert_move(main, level, first)
+            first = False
+            for side in node.variations[1:]:
+                self.move_text.insert(tk.END, "( ", "variation")
+                self._insert_move(side, level + 1, True)
+                self._insert_line(side, level + 1)
+                self.move_text.insert(tk.END, ") ", "variation")
+                first = True
+            node = main
+
+    def _insert_move(self, node, level, force_number):
+        """Insert a single clickable move for node"""
+        label = self.move_labels.get(node)
+        if label is None:
+            parent_board = self._board_at(node.parent)
+            label = (parent_board.turn, parent_board.fullmove_number, parent_board.san(node.move))
+            self.move_labels[node] = label
+        turn, number, san = label
+        if turn == chess.WHITE:
+            prefix = f"{number}. "
+        elif force_number:
+            prefix = f"{number}... "
+        else:
+            prefix = ""
+
+        tag = f"node{id(node)}"
+        tags = (tag, "variation") if level else (tag,)
+        self.move_text.insert(tk.END, prefix + san, tags)
+        self.move_text.insert(tk.END, " ", "variation" if level else ())
+        self.move_text.tag_bind(tag, "<Button-1>", lambda e, n=node: self.go_to_node(n))
+
+    def _update_explorer(self):
+        """Show the index statistics for the current position"""
+        if self.board is self._explorer_board:
+            return  # Boards are cached per node, so identity means same position
+        self._explorer_board = self.board
+
+        self.explorer_text.delete(1.0, tk.END)
+        if self.position_index is None:
+            self.explorer_text.insert(tk.END, "No index loaded.")
+            return
+
+        moves = self.position_index.lookup(self.board)
+        if not moves:
+            self.explorer_text.insert(tk.END, "Position not in index.")
+            return
+
+        for move, white, draws, black, _ in moves:
+            total = white + draws + black
+            tag = f"explore{move.uci()}"
+            line = (f"{self.board.san(move):<8}{total:>9} games   "
+                    f"W {100*white/total:4.1f}%  D {100*draws/total:4.1f}%  B {100*black/total:4.1f}%\n")
+            self.explorer_text.insert(tk.END, line, tag)
+            self.explorer_text.tag_bind(tag, "<Button-1>", lambda e, m=move: self._play_explorer_move(m))
+
+    def _play_explorer_move(self, move):
+        """Play a move picked in the explorer panel"""
+        if move in self.board.legal_moves:
+            self._play_move(move)
+            self.draw_board()
+
+    def _update_analysis_panel(self):
+        """Show the MultiPV lines of the current position in SAN"""
+        self.analysis_text.delete(1.0, tk.END)
+        if self.multipv_key != self.board_key:
+            return
+
+        for i, (score, pv, depth) in enumerate(self.multipv_lines):
+            tag = f"line{i}"
+            line = f"{i + 1}. {self._format_eval(score):>6}  d{depth:<3} {self.board.variation_san(pv[:PV_SAN_PLIES])}\n"
+            self.analysis_text.insert(tk.END, line, tag)
+            self.analysis_text.tag_configure(tag, foreground=ARROW_COLORS[i % len(ARROW_COLORS)])
+            self.analysis_text.tag_bind(tag, "<Button-1>", lambda e, i=i: self._preview_line(i))
+
+    def _preview_line(self, index):
+        """Show the position at the end of a MultiPV line without playing it"""
+        if self.multipv_key != self.board_key or index >= len(self.multipv_lines):
+            return
+        board = self.board.copy()
+        for move in self.multipv_lines[index][1][:PV_SAN_PLIES]:
+            board.push(move)
+        self.preview = board
+        self.selected = None
+        self.draw_board()
+        self.status.set(f"Previewing line {index + 1} | Click the board or press Esc to return")
+
+    def _end_preview(self):
+        """Return from a line preview to the current position"""
+        if self.preview is not None:
+            self.preview = None
+            self.draw_board()
+
+    def _update_status(self):
+        """Update status bar with game information"""
+        if self.engine_thinking:
+            return  # Don't overwrite thinking status
+        
+        if self.board.is_checkmate():
+            winner = "Black" if self.board.turn else "White"
+            self.status.set(f"Checkmate! {winner} wins!")
+        elif self.board.is_stalemate():
+            self.status.set("Stalemate!")
+        elif self.board.is_insufficient_material():
+            self.status.set("Draw by insufficient material")
+        elif self.board.is_check():
+            self.status.set("Check!")
+        else:
+            turn = "White" if self.board.turn else "Black"
+            eval_str = ""
+            if self.current_eval:
+                eval_str = f" | Eval: {self._format_eval(self.current_eval)}"
+            self.status.set(f"{turn} to move | Moves: {self.node.ply() - self.game.ply()}{eval_str}")
+
+    def _format_eval(self, score):
+        """Format evaluation score for display"""
+        # Convert PovScore to white's perspective
+        score_white = score.white()
+        
+        if score_white.is_mate():
+            mate_in = score_white.mate()
+            return f"M{mate_in}" if mate_in > 0 else f"-M{abs(mate_in)}"
+        else:
+            # Convert centipawns to pawns
+            cp = score_white.score()
+            if cp is None:
+                return "0.0"
+            return f"{cp/100:+.1f}"
+
+    def _draw_eval_bar(self):
+        """Draw the evaluation bar"""
+        self.eval_canvas.delete("all")
+        
+        board_height = self.square_size * 8
+        center_y = board_height // 2
+        
+        if self.current_eval is None:
+            # Draw neutral bar (50/50)
+            self.eval_canvas.create_rectangle(
+                0, 0, self.eval_bar_width, center_y,
+                fill=EVAL_BLACK_COLOR, outline=""
+            )
+            self.eval_canvas.create_rectangle(
+                0, center_y, self.eval_bar_width, board_height,
+                fill=EVAL_WHITE_COLOR, outline=""
+            )
+            # Draw center line
+            self.eval_canvas.create_line(
+                0, center_y, self.eval_bar_width, center_y,
+                fill="#888888", width=1
+            )
+            return
+        
+        # Convert PovScore to white's perspective
+        score_white = self.current_eval.white()
+        
+        # Calculate bar percentage based on evaluation
+        if score_white.is_mate():
+            mate_in = score_white.mate()
+            # Mate score: full bar for the winning side
+            if mate_in > 0:
+                white_percentage = 100
+            else:
+                white_percentage = 0
+        else:
+            cp = score_white.score()
+            if cp is None:
+                cp = 0
+            
+            # Improved evaluation bar calculation
+            # Uses a more gradual sigmoid curve for better visual representation
+            # Based on common chess engine evaluation bars
+            
+            # Clamp to reasonable range for visualization
+            cp_clamped = max(-1500, min(1500, cp))
+            
+            # Sigmoid-like transformation
+            # This makes:
+            # - cp=0 -> 50%
+            # - cp=+100 (1 pawn) -> ~57%
+            # - cp=+300 (3 pawns) -> ~70%
+            # - cp=+600 -> ~85%
+            # - cp=+1000 -> ~95%
+            win_probability = 50 + 50 * (2 / (1 + pow(10, -cp_clamped / 400)) - 1)
+            white_percentage = max(0, min(100, win_probability))
+        
+        # Calculate heights
+        white_height = int(board_height * white_percentage / 100)
+        black_height = board_height - white_height
+        
+        # Draw black portion (top)
+        if black_height > 0:
+            self.eval_canvas.create_rectangle(
+                0, 0, self.eval_bar_width, black_height,
+                fill=EVAL_BLACK_COLOR, outline=""
+            )
+        
+        # Draw white portion (bottom)
+        if white_height > 0:
+            self.eval_canvas.create_rectangle(
+                0, black_height, self.eval_bar_width, board_height,
+                fill=EVAL_WHITE_COLOR, outline=""
+            )
+        
+        # Draw center line for reference
+        self.eval_canvas.create_line(
+            0, center_y, self.eval_bar_width, center_y,
+            fill="#666666", width=1
+        )
+        
+        # Draw evaluation text
+        eval_text = self._format_eval(self.current_eval)
+        
+        # Determine text position and color based on evaluation
+        if white_percentage > 60:
+            # White is winning significantly - put text in white area
+            text_y = black_height + white_height // 2
+            text_color = "#404040"
+        elif white_percentage < 40:
+            # Black is winning significantly - put text in black area
+            text_y = black_height // 2
+            text_color = "#C0C0C0"
+        else:
+            # Close to equal - put text near center on larger side
+            if white_percentage >= 50:
+                text_y = black_height + white_height // 2
+                text_color = "#404040"
+            else:
+                text_y = black_height // 2
+                text_color = "#C0C0C0"
+        
+        # Draw text with background for better readability
+        text_id = self.eval_canvas.create_text(
+            self.eval_bar_width // 2, text_y,
+            text=eval_text,
+            font=("Arial", 9, "bold"),
+            fill=text_color
+        )
+        
+        # Add border to eval bar
+        self.eval_canvas.create_rectangle(
+            0, 0, self.eval_bar_width, board_height,
+            outline="#999999", width=1
+        )
+
+    def on_click(self, event):
+        """Handle mouse clicks on the board"""
+        if self.preview is not None:
+            self._end_preview()
+            return
+
+        coords = self._get_board_coords(event.x, event.y)
+        if not coords:
+            return
+        
+        c, r = coords
+        sq = chess.square(c, r)
+        piece = self.board.piece_at(sq)
+        
+        if self.selected is None:
+            # Select piece
+            if piece and piece.color == self.board.turn:
+                self.selected = (c, r)
+        else:
+            # Try to make move
+            src = chess.square(self.selected[0], self.selected[1])
+            dest = sq
+            
+            if self._try_move(src, dest):
+                self.selected = None
+            else:
+                # If clicked on own piece, change selection
+                if piece and piece.color == self.board.turn:
+                    self.selected = (c, r)
+                else:
+                    self.selected = None
+        
+        self.draw_board()
+
+    def _try_move(self, src, dest):
+        """Try to make a move, handling promotions"""
+        # Check if this is a promotion move first
+        piece = self.board.piece_at(src)
+        needs_promotion = False
+        
+        if piece and piece.piece_type == chess.PAWN:
+            # Check if pawn is moving to last rank
+            dest_rank = chess.square_rank(dest)
+            if (piece.color == chess.WHITE and dest_rank == 7) or \
+               (piece.color == chess.BLACK and dest_rank == 0):
+                needs_promotion = True
+        
+        if needs_promotion:
+            # Ask for promotion piece
+            promotion_piece = self._ask_promotion()
+            if promotion_piece is None:
+                return False  # User cancelled
+            
+            move = chess.Move(src, dest, promotion=promotion_piece)
+            if move in self.board.legal_moves:
+                self._play_move(move)
+                return True
+            return False
+        else:
+            # Try normal move (includes castling and en passant)
+            move = chess.Move(src, dest)
+            if move in self.board.legal_moves:
+                self._play_move(move)
+                return True
+        
+        return False
+
+    def _play_move(self, move):
+        """Play move from the current node, reusing an existing variation if present"""
+        if self.node.has_variation(move):
+            child = self.node.variation(move)
+        else:
+            child = self.node.add_variation(move)
+            self._move_list_dirty = True
+        self.go_to_node(child, redraw=False)
+
+    def _board_at(self, node):
+        """Return the cached board for node, building missing ancestors once"""
+        path = []
+        while node not in self.node_boards:
+            path.append(node)
+            node = node.parent
+        board = self.node_boards[node]
+        for child in reversed(path):
+            # Only moves since the last capture or pawn move can repeat a
+            # position, so the snapshot keeps just those instead of the
+            # whole game
+            board = board.copy(stack=min(board.halfmove_clock, HISTORY_PLIES))
+            board.push(child.move)
+            self.node_boards[child] = board
+        return board
+
+    def go_to_node(self, node, redraw=True):
+        """Jump to any node of the game tree"""
+        self.node = node
+        self.board = self._board_at(node)
+        self.last_move = node.move if node.parent is not None else None
+        self.selected = None
+        self.preview = None
+        self.board_key = chess.polyglot.zobrist_hash(self.board)
+        cached = self.position_evals.get(self.board_key)
+        self.current_eval = cached[0] if cached else None
+
+        # A streaming analysis of the previous position is no longer needed
+        if self._analysis_stop is not None:
+            self._analysis_stop.set()
+        self._update_analysis_panel()
+
+        if redraw:
+            self.draw_board()
+
+        # Auto-analyze if enabled
+        if self.auto_analyze.get():
+            self.after(100, self._quick_analyze)
+
+    def go_back(self):
+        """Step back to the parent position without discarding the line"""
+        if self.node.parent is not None:
+            self.go_to_node(self.node.parent)
+
+    def go_forward(self):
+        """Step forward along the main continuation of the current node"""
+        if self.node.variations:
+            self.go_to_node(self.node.variations[0])
+    
+    def _ask_promotion(self):
+        """Show dialog to select promotion piece - FIXED VERSION"""
+        dialog = tk.Toplevel(self)
+        dialog.title("Promote Pawn")
+        dialog.configure(bg="#E0E0E0")
+        dialog.transient(self)
+        dialog.resizable(False, False)
+        
+        selected_piece = [None]  # Use list to store result
+        
+        tk.Label(dialog, text="Select promotion piece:", 
+                font=("Arial", 12), bg="#E0E0E0").pack(pady=15, padx=20)
+        
+        button_frame = tk.Frame(dialog, bg="#E0E0E0")
+        button_frame.pack(pady=10, padx=20)
+        
+        def select_piece(piece):
+            selected_piece[0] = piece
+            dialog.destroy()
+        
+        # Create buttons with unicode pieces - all four promotion options
+        pieces = [
+            (chess.QUEEN, "♕ Queen", "Q"),
+            (chess.ROOK, "♖ Rook", "R"),
+            (chess.BISHOP, "♗ Bishop", "B"),
+            (chess.KNIGHT, "♘ Knight", "N")
+        ]
+        
+        for piece_type, label, _ in pieces:
+            btn = tk.Button(
+                button_frame,
+                text=label,
+                font=("DejaVu Sans", 14),
+                width=10,
+                command=lambda p=piece_type: select_piece(p)
+            )
+            btn.pack(side=tk.LEFT, padx=5)
+        
+        # Handle window close - default to Queen
+        dialog.protocol("WM_DELETE_WINDOW", lambda: select_piece(chess.QUEEN))
+        
+        # Center the dialog - do this AFTER creating all widgets
+        dialog.update_idletasks()
+        
+        # Calculate position to center on parent
+        parent_x = self.winfo_x()
+        parent_y = self.winfo_y()
+        parent_width = self.winfo_width()
+        parent_height = self.winfo_height()
+        
+        dialog_width = dialog.winfo_reqwidth()
+        dialog_height = dialog.winfo_reqheight()
+        
+        x = parent_x + (parent_width - dialog_width) // 2
+        y = parent_y + (parent_height - dialog_height) // 2
+        
+        dialog.geometry(f"+{x}+{y}")
+        
+        # IMPORTANT: Set grab AFTER window is positioned and visible
+        dialog.deiconify()  # Ensure window is visible
+        dialog.update()  # Process all pending events
+        
+        try:
+            dialog.grab_set()  # Now grab should work
+        except tk.TclError:
+            pass  # If grab fails, continue anyway
+        
+        dialog.focus_set()
+        
+        # Wait for dialog to close
+        self.wait_window(dialog)
+        
+        return selected_piece[0]
+
+    def flip_board(self):
+        """Flip the board orientation"""
+        self.flipped = not self.flipped
+        self.draw_board()
+
+    def ensure_engine(self):
+        """Ensure engine is loaded and ready"""
+        if self.engine is not None:
+            return True
+
+        import uci_recorder
+
+        if self.replay_uci:
+            return self._start_engine(uci_recorder.replay_command(self.replay_uci), self.replay_uci)
+
+        path = self.engine_entry.get().strip() or self.engine_path
+        if not path:
+            messagebox.showerror("Engine not set", 
+                               "Set the engine path first (stockfish binary).")
+            return False
+
+        if not shutil.which("stockfish") and (not os.path.isfile(path) or not os.access(path, os.X_OK)):
+            messagebox.showerror("Engine not executable",
+                               f"Stockfish binary not found or not executable at:\n{path}")
+            return False
+
+        command = path
+        if self.record_uci:
+            command = uci_recorder.record_command(path, self.record_uci)
+        return self._start_engine(command, path)
+
+    def _start_engine(self, command, path):
+        """Start the UCI engine process given by command"""
+        import chess.engine
+
+        try:
+            self.engine = chess.engine.SimpleEngine.popen_uci(command)
+            return True
+        except Exception as e:
+            messagebox.showerror("Engine error", 
+                               f"Failed to start engine at {path}\n\n{e}")
+            return False
+
+    def do_engine_move(self):
+        """Request engine to make a move"""
+        if self.engine_thinking:
+            return
+        
+        if not self.ensure_engine():
+            return
+        
+        if self.board.is_game_over():
+            messagebox.showinfo("Game Over", "The game is already over!")
+            return
+        
+        depth = int(self.depth_var.get())
+        self.status.set("Engine thinking...")
+        self._start_engine_job(self._engine_move_thread, depth)
+
+    def _start_engine_job(self, target, depth, *extra):
+        """Run target(node, board, key, depth, *extra) in a thread on a snapshot of the current position
+
+        The worker only ever sees its own board copy; results come back through
+        self.after() and are applied on the Tk thread, where the node and key
+        tell whether they still belong to the position being shown.
+        """
+        self.engine_thinking = True
+        args = (self.node, self.board.copy(), self.board_key, depth, *extra)
+        threading.Thread(target=target, args=args, daemon=True).start()
+
+    def _engine_move_thread(self, node, board, key, depth):
+        """Engine move calculation thread"""
+        import chess.engine
+
+        try:
+            limit = chess.engine.Limit(depth=depth)
+            result = self.engine.play(board, limit)
+            
+            if result and result.move:
+                # Get evaluation after move (always for engine moves)
+                board.push(result.move)
+                info = self.engine.analyse(board, chess.engine.Limit(depth=min(depth, 15)))
+                after_key = chess.polyglot.zobrist_hash(board)
+                self.after(0, self._apply_engine_move, node, key, result.move,
+                           after_key, info.get("score"), min(depth, 15))
+            else:
+                self.after(0, self._finish_engine_job, "Engine returned no move.")
+        except Exception as e:
+            self.after(0, self._fail_engine_job, "Engine failed.", str(e))
+
+    def _apply_engine_move(self, node, key, move, after_key, score, depth):
+        """Play the engine's move on the Tk thread if its position is still shown"""
+        self._store_eval(after_key, score, depth)
+        if node is not self.node or key != self.board_key:
+            self._finish_engine_job("Engine move discarded: position changed.")
+            # The auto-analysis scheduled by the navigation was skipped while we searched
+            if self.auto_analyze.get():
+                self._quick_analyze()
+            return
+        self.engine_thinking = False
+        self._play_move(move)
+        self.draw_board()
+        self.status.set(f"Engine played: {move}")
+
+    def do_analyze(self):
+        """Run engine analysis"""
+        if self.engine_thinking:
+            return
+        
+        if not self.ensure_engine():
+            return
+        
+        depth = int(self.depth_var.get())
+        lines = max(1, int(self.multipv_var.get()))
+        self.status.set("Analyzing...")
+        self._analysis_stop = threading.Event()
+        self._start_engine_job(self._analyze_thread, depth, lines, self._analysis_stop)
+
+    def _analyze_thread(self, node, board, key, depth, lines, stop):
+        """Engine analysis thread: one MultiPV search, streamed as it deepens"""
+        import chess.engine
+
+        try:
+            last_update = 0
+            with self.engine.analysis(board, chess.engine.Limit(depth=depth), multipv=lines) as analysis:
+                for info in analysis:
+                    if stop.is_set():
+                        break
+                    now = time.monotonic()
+                    if "pv" in info and now - last_update >= ANALYSIS_UPDATE_MS / 1000:
+                        last_update = now
+                        self.after(0, self._apply_multipv, key, self._multipv_lines(analysis), False)
+                result = self._multipv_lines(analysis)
+            self.after(0, self._apply_multipv, key, result, True)
+        except Exception as e:
+            self.after(0, self._fail_engine_job, "Analysis failed.", str(e))
+
+    @staticmethod
+    def _multipv_lines(analysis):
+        """[(score, pv, depth)] of the latest info for each MultiPV line"""
+        return [(info["score"], list(info["pv"]), info.get("depth", 0))
+                for info in analysis.multipv if info.get("pv") and "score" in info]
+
+    def _apply_multipv(self, key, lines, final):
+        """Show streamed MultiPV lines on the Tk thread; finish the job on the final update"""
+        if key == self.board_key:
+            self.multipv_key = key
+            self.multipv_lines = lines
+            self._update_analysis_panel()
+            self._draw_arrows()
+            if lines:
+                self.current_eval = lines[0][0]
+                self._draw_eval_bar()
+        if not final:
+            return
+
+        score, pv, depth = lines[0] if lines else (None, [], 0)
+        status = None
+        if key == self.board_key:
+            pv_str = self.board.variation_san(pv[:5]) if pv else "None"
+            eval_str = self._format_eval(score) if score else "N/A"
+            status = f"Evaluation: {eval_str} | Best line: {pv_str}"
+        self._apply_analysis(key, score, depth, status)
+
+    def _quick_analyze(self):
+        """Quick analysis for auto-analyze feature (lower depth)"""
+        # Use lower depth for quick analysis (depth 15)
+        quick_depth = min(15, int(self.depth_var.get()))
+
+        # Positions analysed before reuse their stored evaluation
+        cached = self.position_evals.get(self.board_key)
+        if cached and cached[1] >= quick_depth:
+            if self.current_eval is not cached[0]:
+                self.current_eval = cached[0]
+                self.draw_board()
+            return
+
+        if self.engine_thinking or not self.ensure_engine():
+            return
+        
+        self._start_engine_job(self._quick_analyze_thread, quick_depth)
+
+    def _quick_analyze_thread(self, node, board, key, depth):
+        """Quick analysis thread"""
+        import chess.engine
+
+        try:
+            info = self.engine.analyse(board, chess.engine.Limit(depth=depth))
+            self.after(0, self._apply_analysis, key, info.get("score"), depth, None)
+        except Exception:
+            self.after(0, self._finish_engine_job, None)  # Silently fail for auto-analysis
+
+    def _apply_analysis(self, key, score, depth, status):
+        """Store an analysis result on the Tk thread and show it if still current"""
+        self._store_eval(key, score, depth)
+        self.engine_thinking = False
+        if key != self.board_key:
+            # The user moved on while the engine was searching
+            self._update_status()
+            if self.auto_analyze.get():
+                self._quick_analyze()
+            return
+        self.current_eval = self.position_evals.get(key, (score,))[0]
+        self.draw_board()
+        if status:
+            self.status.set(status)
+
+    def _finish_engine_job(self, status):
+        """Mark the engine idle again on the Tk thread"""
+        self.engine_thinking = False
+        if status:
+            self.status.set(status)
+
+    def _fail_engine_job(self, status, error):
+        """Report an engine error on the Tk thread"""
+        self._finish_engine_job(status)
+        messagebox.showerror("Engine error", error)
+
+    def _store_eval(self, key, score, depth):
+        """Remember an evaluation for a position, keeping the deepest one"""
+        cached = self.position_evals.get(key)
+        if score is not None and (cached is None or depth >= cached[1]):
+            self.position_evals[key] = (score, depth)
+
+    def toggle_auto_analyze(self):
+        """Toggle auto-analysis on/off"""
+        if self.auto_analyze.get():
+            if not self.ensure_engine():
+                self.auto_analyze.set(False)
+                return
+            # Run initial analysis
+            self._quick_analyze()
+
+    def new_game(self):
+        """Start a new game"""
+        import chess.pgn
+
+        if messagebox.askyesno("New Game", "Start a new game?"):
+            self._set_game(chess.pgn.Game())
+
+    def _set_game(self, game, node=None):
+        """Replace the game tree and jump to node (defaults to the root)"""
+        self.game = game
+        self.node_boards = {game: game.board()}
+        self.move_labels = {}
+        self._move_list_dirty = True
+        self.current_eval = None
+        self.go_to_node(node or game)
+
+    def load_fen(self):
+        """Load position from FEN"""
+        import chess.pgn
+        from tkinter import simpledialog
+
+        s = simpledialog.askstring("Load FEN", "Enter FEN string:", 
+                                   initialvalue=self.board.fen())
+        if s:
+            try:
+                game = chess.pgn.Game()
+                game.setup(chess.Board(fen=s))
+                self._set_game(game)
+            except Exception as e:
+                messagebox.showerror("Invalid FEN", str(e))
+
+    def save_fen(self):
+        """Save current position as FEN"""
+        fen = self.board.fen()
+        try:
+            self.clipboard_clear()
+            self.clipboard_append(fen)
+            messagebox.showinfo("FEN Saved", f"FEN copied to clipboard:\n\n{fen}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to copy to clipboard:\n{e}")
+
+    def load_pgn(self):
+        """Load game from PGN file"""
+        import chess.pgn
+        from tkinter import filedialog
+
+        filename = filedialog.askopenfilename(
+            title="Load PGN",
+            filetypes=[("PGN files", "*.pgn"), ("All files", "*.*")]
+        )
+        if filename:
+            try:
+                with open(filename, "r") as f:
+                    game = chess.pgn.read_game(f)
+                    if game:
+                        self._set_game(game, game.end())
+                    else:
+                        messagebox.showerror("Error", "No game found in PGN file")
+            except Exception as e:
+                messagebox.showerror("Error loading PGN", str(e))
+
+    def save_pgn(self):
+        """Save game to PGN file"""
+        from tkinter import filedialog
+
+        filename = filedialog.asksaveasfilename(
+            title="Save PGN",
+            defaultextension=".pgn",
+            filetypes=[("PGN files", "*.pgn"), ("All files", "*.*")]
+        )
+        if filename:
+            try:
+                game = self.game
+                if game.headers["Event"] == "?":
+                    game.headers["Event"] = "Casual Game"
+                if game.headers["Date"] == "????.??.??":
+                    game.headers["Date"] = datetime.now().strftime("%Y.%m.%d")
+                
+                with open(filename, "w") as f:
+                    f.write(str(game))
+                
+                messagebox.showinfo("Success", f"Game saved to {filename}")
+            except Exception as e:
+                messagebox.showerror("Error saving PGN", str(e))
+
+    def open_index(self):
+        """Open a position index for the explorer panel"""
+        from tkinter import filedialog
+        import position_index
+
+        filename = filedialog.askopenfilename(
+            title="Open Index",
+            filetypes=[("Position index", "*.idx"), ("All files", "*.*")]
+        )
+        if filename:
+            try:
+                index = position_index.PositionIndex(filename)
+            except Exception as e:
+                messagebox.showerror("Error opening index", str(e))
+                return
+            if self.position_index is not None:
+                self.position_index.close()
+            self.position_index = index
+            self._explorer_board = None
+            self.draw_board()
+
+    def set_engine_path(self):
+        """Set the engine path"""
+        path = self.engine_entry.get().strip()
+        if not path:
+            messagebox.showerror("Path empty", "Please enter the stockfish executable path.")
+            return
+        
+        self.engine_path = path
+        
+        # Restart engine if already running
+        if self.engine:
+            try:
+                self.engine.quit()
+            except Exception:
+                pass
+            self.engine = None
+        
+        messagebox.showinfo("Engine set", f"Engine path set to: {path}")
+
+    def on_close(self):
+        """Clean up on window close"""
+        if self.engine:
+            try:
+                self.engine.quit()
+            except Exception:
+                pass
+        self.destroy()
+
@@ -0,0 +1,230 @@
+"""
+Position index over PGN databases for the opening explorer.
+
+The index maps a Zobrist hash to the moves played from that position, with
+white win / draw / black win counts and the byte offset of a sample game.
+It is stored in SQLite as a table clustered on (hash, move), so a lookup is
+a single B-tree range scan regardless of how many games were indexed.
+
+Building streams the PGN file in byte-range chunks that are parsed in
+parallel worker processes and merged into the database.
+"""
+import io
+import os
+import pathlib
+import re
+import sqlite3
+from multiprocessing import Pool
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+MAX_PLY = 40  # Only the opening phase is indexed
+CHUNKS_PER_JOB = 4  # Smaller chunks balance the work across processes
+RESULTS = {"1-0": 0, "1/2-1/2": 1, "0-1": 2}
+TAG_PAIR = re.compile(rb'\[\w+\s+"')  # A header line, not a wrapped [%clk ...] comment
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS positions (
+    hash INTEGER NOT NULL,
+    move TEXT NOT NULL,
+    white INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    black INTEGER NOT NULL,
+    sample INTEGER NOT NULL,
+    PRIMARY KEY (hash, move)
+) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO positions (hash, move, white, draws, black, sample) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (hash, move) DO UPDATE SET
+    white = white + excluded.white,
+    draws = draws + excluded.draws,
+    black = black + excluded.black,
+    sample = min(sample, excluded.sample)
+"""
+
+
+def position_key(board):
+    """Zobrist hash of board as a signed 64-bit SQLite integer"""
+    h = chess.polyglot.zobrist_hash(board)
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+class _MainlineVisitor(chess.pgn.BaseVisitor):
+    """Collect (hash, move) pairs of the mainline without building a game tree"""
+
+    def __init__(self, max_ply):
+        self.max_ply = max_ply
+        self.outcome = None
+        self.pairs = []
+        self.bad = False
+
+    def visit_header(self, tagname, tagvalue):
+        if tagname == "Result":
+            self.outcome = RESULTS.get(tagvalue)
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def visit_move(self, board, move):
+        if len(self.pairs) < self.max_ply:
+            self.pairs.append((position_key(board), move.uci()))
+
+    def handle_error(self, error):
+        # Broken games (illegal moves etc.) are skipped instead of failing the build
+        self.bad = True
+
+    def result(self):
+        return self
+
+
+def _iter_games(path, start, end):
+    """Yield (offset, text) for every game starting in [start, end) of path
+
+    start must be the offset of a game's first header line (see _chunk_bounds).
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        game_start = None
+        lines = []
+        in_headers = False
+        for line in f:
+            is_header = TAG_PAIR.match(line) is not None
+            if is_header and not in_headers:
+                if game_start is not None:
+                    yield game_start, b"".join(lines).decode("utf-8", "replace")
+                if offset >= end:
+                    return
+                game_start = offset
+                lines = []
+            if line.strip():
+                in_headers = is_header
+            if game_start is not None:
+                lines.append(line)
+            offset += len(line)
+        if game_start is not None:
+            yield game_start, b"".join(lines).decode("utf-8", "replace")
+
+
+def _index_chunk(args):
+    """Worker: aggregate move statistics for one byte range of the PGN file"""
+    path, start, end, max_ply = args
+    stats = {}
+    for offset, text in _iter_games(path, start, end):
+        visitor = chess.pgn.read_game(io.StringIO(text), Visitor=lambda: _MainlineVisitor(max_ply))
+        if visitor is None or visitor.bad or visitor.outcome is None:
+            continue
+        for key in visitor.pairs:
+            entry = stats.get(key)
+            if entry is None:
+                entry = stats[key] = [0, 0, 0, offset]
+            entry[visitor.outcome] += 1
+    return [(h, m, w, d, b, s) for (h, m), (w, d, b, s) in stats.items()]
+
+
+def _next_game_start(f, offset):
+    """Offset of the first game header block starting after offset"""
+    f.seek(offset)
+    offset += len(f.readline())  # Skip the (possibly partial) current line
+    prev_header = True
+    for line in f:
+        is_header = TAG_PAIR.match(line) is not None
+        if is_header and not prev_header:
+            return offset
+        if line.strip():
+            prev_header = is_header
+        offset += len(line)
+    return offset
+
+
+def _chunk_bounds(path, chunks, start=0):
+    """Split path from start on into roughly equal byte ranges aligned to game starts"""
+    size = os.path.getsize(path)
+    if start >= size:
+        return []
+    step = max(1, (size - start) // chunks)
+    bounds = [start]
+    with open(path, "rb") as f:
+        for raw in range(start + step, size, step):
+            start = _next_game_start(f, max(raw, bounds[-1]))
+            if start >= size:
+                break
+            if start > bounds[-1]:
+                bounds.append(start)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def build_index(pgn_path, index_path, jobs=None, max_ply=MAX_PLY, progress=None):
+    """Index pgn_path into the SQLite database index_path, using jobs processes
+
+    An existing index is extended with the games appended to its PGN file
+    since the last build; games indexed before are not counted twice. The
+    whole build is one transaction, so a failed build can simply be rerun.
+    Indexing any other file, or a file that has shrunk, raises ValueError.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    source = os.path.abspath(pgn_path)
+    db = sqlite3.connect(index_path)
+    try:
+        db.executescript(SCHEMA)
+        meta = dict(db.execute("SELECT key, value FROM meta"))
+        # Sample offsets point into the source PGN, so one index has one source
+        if "pgn" in meta and meta["pgn"] != source:
+            raise ValueError(f"{index_path} was built from {meta['pgn']}, not {source}")
+        if "pgn" in meta and "indexed" not in meta:
+            raise ValueError(f"{index_path} does not record how much of {source} it holds; delete it to rebuild")
+        indexed = int(meta.get("indexed", 0))
+        size = os.path.getsize(pgn_path)
+        if size < indexed:
+            raise ValueError(f"{source} is smaller than when {index_path} was built; delete the index to rebuild")
+
+        tasks = [(pgn_path, start, end, max_ply)
+                 for start, end in _chunk_bounds(pgn_path, jobs * CHUNKS_PER_JOB, indexed)]
+        with db, Pool(jobs) as pool:
+            for done, rows in enumerate(pool.imap_unordered(_index_chunk, tasks), 1):
+                db.executemany(UPSERT, rows)
+                if progress:
+                    progress(done, len(tasks))
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('pgn', ?)", (source,))
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('indexed', ?)", (str(size),))
+    finally:
+        db.close()
+
+
+class PositionIndex:
+    """Read-only view of an index built by build_index"""
+
+    def __init__(self, index_path):
+        self.path = index_path
+        self.db = sqlite3.connect(pathlib.Path(index_path).resolve().as_uri() + "?mode=ro", uri=True)
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'pgn'").fetchone()
+        self.pgn_path = row[0] if row else None
+
+    def lookup(self, board):
+        """Return [(move, white, draws, black, sample_offset)] for board, most played first"""
+        rows = self.db.execute(
+            "SELECT move, white, draws, black, sample FROM positions WHERE hash = ?",
+            (position_key(board),)
+        ).fetchall()
+        moves = []
+        for uci, white, draws, black, sample in rows:
+            move = chess.Move.from_uci(uci)
+            if board.is_legal(move):  # Guards against hash collisions
+                moves.append((move, white, draws, black, sample))
+        moves.sort(key=lambda m: m[1] + m[2] + m[3], reverse=True)
+        return moves
+
+    def read_game(self, offset):
+        """Load the sample game stored at offset in the source PGN"""
+        with open(self.pgn_path, "rb") as f:
+            f.seek(offset)
+            return chess.pgn.read_game(io.TextIOWrapper(f, encoding="utf-8", errors="replace"))
+
+    def close(self):
+        self.db.close()
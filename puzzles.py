@@ -0,0 +1,263 @@
+"""
+Tactic/puzzle mining over PGN databases.
+
+A streaming pipeline of stages connected by bounded queues:
+
+    read    PGN games are parsed one at a time, never the whole file
+    scan    a shallow search on every ply finds moves that throw away a lot
+            of evaluation; the position after such a move is a candidate
+    verify  a deep MultiPV search keeps candidates with a single winning
+            move (clear gap to the second best) and a forcing line
+    write   puzzles are written as EPD or JSON lines
+
+Scan and verify each run on their own pool of engines (one engine per
+thread). The queues are small, so the cheap scan stage runs just far enough
+ahead to keep the verify engines busy and memory use does not depend on the
+size of the database.
+
+    python sf.py puzzles games.pgn puzzles.epd --scan-engines 2 --verify-engines 4
+"""
+import json
+import queue
+import sys
+import threading
+
+import chess
+import chess.engine
+import chess.pgn
+
+DEFAULT_ENGINE = "bin/stockfish"
+MATE_SCORE = 100000
+
+SCAN_DEPTH = 8
+VERIFY_DEPTH = 18
+SWING_CP = 200  # Evaluation the played move must lose to be a candidate
+WIN_CP = 200  # The side to move must be at least this much better
+UNIQUE_GAP_CP = 150  # Best move must beat the second best by this much
+PUZZLE_PLIES = 8  # Length of the solution line written out
+MAX_RESTARTS = 3  # Engine restarts per stage thread before it gives up
+
+
+def _cp(score, color):
+    """Centipawns of a PovScore from color's point of view, mates as +/-MATE_SCORE"""
+    return score.pov(color).score(mate_score=MATE_SCORE)
+
+
+class _Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.games = self.plies = self.candidates = self.puzzles = 0
+        self.errors = []  # Errors of all stages; any error fails the run
+
+    def add(self, **counts):
+        with self.lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+
+class _Writer:
+    """Thread-safe puzzle writer; EPD for .epd paths, JSON lines otherwise"""
+
+    def __init__(self, path):
+        self.epd = path.lower().endswith(".epd")
+        self.f = open(path, "w")
+        self.lock = threading.Lock()
+
+    def write(self, puzzle):
+        if self.epd:
+            board = chess.Board(puzzle["fen"])
+            line = board.epd(bm=chess.Move.from_uci(puzzle["moves"][0]), id=puzzle["id"],
+                             c0=" ".join(puzzle["moves"]))
+        else:
+            line = json.dumps(puzzle)
+        with self.lock:
+            self.f.write(line + "\n")
+            self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class _Stage:
+    """The engine threads of one stage; the pipeline stops once all have failed"""
+
+    def __init__(self, name, threads, stop):
+        self.name = name
+        self.alive = threads
+        self.stop = stop
+        self.lock = threading.Lock()
+
+    def thread_failed(self):
+        with self.lock:
+            self.alive -= 1
+            if self.alive == 0:
+                print(f"{self.name}: every engine failed, stopping", file=sys.stderr)
+                self.stop.set()
+
+
+def _read_games(pgn, games, workers, counters, stop):
+    """read stage: push (game id, start board, moves) tuples, then one stop marker per worker"""
+    try:
+        number = 0
+        while not stop.is_set():
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            number += 1
+            game_id = game.headers.get("Site", "?")
+            if game_id in ("?", ""):
+                game_id = f"{pgn.name}#{number}"
+            games.put((game_id, game.board(), list(game.mainline_moves())))
+            counters.add(games=1)
+    except Exception as e:
+        counters.errors.append(e)
+        stop.set()
+    finally:
+        for _ in range(workers):
+            games.put(None)
+
+
+def _scan_game(engine, limit, game_id, board, moves, candidates, counters):
+    """scan stage for one game: queue positions right after a large eval swing"""
+    before = engine.analyse(board, limit).get("score")
+    for ply, move in enumerate(moves, 1):
+        mover = board.turn
+        board.push(move)
+        if board.is_game_over():
+            break
+        after = engine.analyse(board, limit).get("score")
+        counters.add(plies=1)
+        if before is not None and after is not None:
+            loss = _cp(before, mover) - _cp(after, mover)
+            if loss >= SWING_CP and _cp(after, board.turn) >= WIN_CP:
+                candidates.put((game_id, ply, board.copy(stack=False)))
+                counters.add(candidates=1)
+        before = after
+
+
+def _verify(engine, limit, game_id, ply, board, writer, counters):
+    """verify stage: keep a candidate if it has one clearly best, forcing solution"""
+    infos = engine.analyse(board, limit, multipv=2)
+    best = infos[0]
+    pv = best.get("pv", [])
+    if not pv or "score" not in best:
+        return
+
+    best_cp = _cp(best["score"], board.turn)
+    if best_cp < WIN_CP:
+        return
+    if len(infos) > 1 and "score" in infos[1]:
+        if best_cp - _cp(infos[1]["score"], board.turn) < UNIQUE_GAP_CP:
+            return  # Several moves win: not a puzzle
+
+    first = pv[0]
+    forcing = best["score"].relative.is_mate() or board.is_capture(first) or board.gives_check(first)
+    if not forcing:
+        return
+
+    writer.write({
+        "id": f"{game_id}@{ply}",
+        "fen": board.fen(),
+        "moves": [m.uci() for m in pv[:PUZZLE_PLIES]],
+        "cp": best_cp,
+    })
+    counters.add(puzzles=1)
+
+
+def _engine_stage(engine_path, inbox, work, stage, errors):
+    """Run work(engine, item) for every item of inbox on a private engine
+
+    An engine that dies is restarted up to MAX_RESTARTS times; after that,
+    or if it cannot be started at all, this thread of the stage has failed.
+    """
+    engine = None
+    restarts = 0
+    try:
+        engine = chess.engine.SimpleEngine.popen_uci(engine_path)
+        while True:
+            item = inbox.get()
+            if item is None:
+                return
+            try:
+                work(engine, item)
+            except chess.engine.EngineTerminatedError as e:
+                restarts += 1
+                if restarts > MAX_RESTARTS:
+                    raise
+                errors.append(e)
+                engine.close()
+                engine = None
+                engine = chess.engine.SimpleEngine.popen_uci(engine_path)
+            except chess.engine.EngineError as e:
+                errors.append(e)
+    except Exception as e:
+        errors.append(e)
+        stage.thread_failed()
+        # Keep draining so the upstream stage never blocks on a full queue
+        while inbox.get() is not None:
+            pass
+    finally:
+        if engine is not None:
+            try:
+                engine.quit()
+            except Exception:
+                pass
+
+
+def mine(pgn_path, output_path, engine_path=DEFAULT_ENGINE, scan_engines=1, verify_engines=1,
+         scan_depth=SCAN_DEPTH, verify_depth=VERIFY_DEPTH, progress=None):
+    """Mine puzzles from pgn_path into output_path; returns the stage counters
+
+    If every engine of a stage fails, or reading fails, the pipeline stops
+    and drains. The errors are collected in counters.errors.
+    """
+    if scan_engines < 1 or verify_engines < 1:
+        raise ValueError("every stage needs at least one engine")  # Queue sizes must stay bounded
+    pgn = open(pgn_path, encoding="utf-8", errors="replace")
+    games = queue.Queue(maxsize=2 * scan_engines)
+    candidates = queue.Queue(maxsize=4 * verify_engines)
+    counters = _Counters()
+    writer = _Writer(output_path)
+    errors = counters.errors
+    stop = threading.Event()
+    scan_stage = _Stage("scan", scan_engines, stop)
+    verify_stage = _Stage("verify", verify_engines, stop)
+    scan_limit = chess.engine.Limit(depth=scan_depth)
+    verify_limit = chess.engine.Limit(depth=verify_depth)
+
+    def scan(engine, item):
+        if stop.is_set():
+            return
+        _scan_game(engine, scan_limit, *item, candidates, counters)
+        if progress:
+            progress(counters)
+
+    def verify(engine, item):
+        if not stop.is_set():
+            _verify(engine, verify_limit, *item, writer, counters)
+
+    reader = threading.Thread(target=_read_games, args=(pgn, games, scan_engines, counters, stop), daemon=True)
+    scanners = [threading.Thread(target=_engine_stage, args=(engine_path, games, scan, scan_stage, errors),
+                                 daemon=True)
+                for _ in range(scan_engines)]
+    verifiers = [threading.Thread(target=_engine_stage, args=(engine_path, candidates, verify, verify_stage, errors),
+                                  daemon=True)
+                 for _ in range(verify_engines)]
+    for t in [reader, *scanners, *verifiers]:
+        t.start()
+
+    try:
+        reader.join()
+        for t in scanners:
+            t.join()
+        for _ in verifiers:
+            candidates.put(None)
+        for t in verifiers:
+            t.join()
+    finally:
+        writer.close()
+        pgn.close()
+
+    for e in errors:
+        print(f"error: {e}", file=sys.stderr)
+    return counters
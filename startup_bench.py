@@ -0,0 +1,88 @@
+"""
+Startup benchmark for sf.py (python sf.py bench-startup).
+
+Every measurement launches a fresh interpreter, the way scripts do, and
+reports the median wall time over several runs against a target:
+
+- headless: "sf.py index --help", which must not import tkinter
+- import:   cumulative import time of the gui module (python -X importtime)
+- paint:    GUI launch until the board canvas has first been exposed and
+            redrawn; the other panels are only built after this
+- ready:    GUI launch until all panels are built and drawn
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sf.py")
+
+# Targets in milliseconds
+HEADLESS_TARGET_MS = 150
+GUI_IMPORT_TARGET_MS = 200
+PAINT_TARGET_MS = 400
+READY_TARGET_MS = 600
+
+
+def _headless_run():
+    """Wall time of a headless command, and whether it imported tkinter"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", SF, "index", "--help"],
+                          capture_output=True, text=True, check=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    imported_tk = any(line.rstrip().endswith("| tkinter") for line in proc.stderr.splitlines())
+    return elapsed, imported_tk
+
+
+def _gui_import_run():
+    """Cumulative import time of the gui module in milliseconds"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import gui"],
+                          capture_output=True, text=True, check=True, cwd=os.path.dirname(SF))
+    for line in proc.stderr.splitlines():
+        if line.rstrip().endswith("| gui"):
+            return int(line.split("|")[1]) / 1000
+    raise RuntimeError("gui import time not reported")
+
+
+def _gui_run():
+    """Milliseconds from launch to first paint and to ready"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, SF, "--startup-probe"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    times = {}
+    for line in proc.stdout:
+        times[line.strip()] = (time.perf_counter() - start) * 1000
+    if proc.wait() != 0:
+        raise RuntimeError(proc.stderr.read().strip() or "GUI probe failed")
+    return times["paint"], times["ready"]
+
+
+def _report(name, samples, target):
+    median = statistics.median(samples)
+    ok = median <= target
+    print(f"{name:<10}{median:8.1f} ms  (target {target} ms)  {'ok' if ok else 'OVER TARGET'}")
+    return ok
+
+
+def run(runs=5, gui=True):
+    """Run the benchmark; returns a process exit code (1 if any target is missed)"""
+    ok = True
+
+    headless = [_headless_run() for _ in range(runs)]
+    ok &= _report("headless", [ms for ms, _ in headless], HEADLESS_TARGET_MS)
+    if any(tk for _, tk in headless):
+        print("headless  imported tkinter")
+        ok = False
+
+    if gui:
+        ok &= _report("import", [_gui_import_run() for _ in range(runs)], GUI_IMPORT_TARGET_MS)
+        try:
+            samples = [_gui_run() for _ in range(runs)]
+        except RuntimeError as e:
+            print(f"paint     skipped: {e.args[0].splitlines()[-1]}")
+            return 1
+        ok &= _report("paint", [paint for paint, _ in samples], PAINT_TARGET_MS)
+        ok &= _report("ready", [ready for _, ready in samples], READY_TARGET_MS)
+
+    return 0 if ok else 1
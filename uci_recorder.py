@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+UCI session recorder and replay engine.
+
+record:  sits between the GUI and a real engine, forwarding every line and
+         logging it with a timestamp.
+replay:  behaves like an engine by playing a recording back, answering each
+         GUI command with the engine lines that followed it, after the same
+         delay as in the original session. No Stockfish is needed.
+latency: summarizes go -> bestmove times of a recording.
+
+Recording format, one line per UCI message:
+    <milliseconds since start> <direction> <line>
+where direction is ">" for GUI -> engine and "<" for engine -> GUI.
+
+    python uci_recorder.py record session.uci -- bin/stockfish
+    python uci_recorder.py replay session.uci
+    python uci_recorder.py latency session.uci
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+TO_ENGINE = ">"
+FROM_ENGINE = "<"
+
+
+def record_command(engine_cmd, log_path):
+    """Command line that runs engine_cmd behind the recorder"""
+    if isinstance(engine_cmd, str):
+        engine_cmd = [engine_cmd]
+    return [sys.executable, os.path.abspath(__file__), "record", log_path, "--", *engine_cmd]
+
+
+def replay_command(log_path):
+    """Command line of a replay engine for the recording at log_path"""
+    return [sys.executable, os.path.abspath(__file__), "replay", log_path]
+
+
+def read_recording(log_path):
+    """Return [(ms, direction, line)] from a recording"""
+    events = []
+    with open(log_path) as f:
+        for raw in f:
+            ms, direction, line = raw.rstrip("\n").split(" ", 2)
+            events.append((float(ms), direction, line))
+    return events
+
+
+class _Log:
+    """Thread-safe timestamped line log"""
+
+    def __init__(self, path):
+        self.f = open(path, "w", buffering=1)
+        self.start = time.monotonic()
+        self.lock = threading.Lock()
+
+    def write(self, direction, line):
+        ms = (time.monotonic() - self.start) * 1000
+        with self.lock:
+            self.f.write(f"{ms:.3f} {direction} {line}\n")
+
+    def close(self):
+        self.f.close()
+
+
+def record(log_path, engine_cmd):
+    """Proxy stdin/stdout to engine_cmd while logging every line"""
+    log = _Log(log_path)
+    engine = subprocess.Popen(engine_cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              text=True, bufsize=1)
+
+    def pump_engine():
+        for line in engine.stdout:
+            line = line.rstrip("\n")
+            log.write(FROM_ENGINE, line)
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    reader = threading.Thread(target=pump_engine, daemon=True)
+    reader.start()
+
+    try:
+        for line in sys.stdin:
+            line = line.rstrip("\n")
+            log.write(TO_ENGINE, line)
+            engine.stdin.write(line + "\n")
+            engine.stdin.flush()
+            if line == "quit":
+                break
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            engine.stdin.close()
+        except BrokenPipeError:
+            pass
+        engine.wait()
+        reader.join(timeout=1)
+        log.close()
+    return engine.returncode
+
+
+def _find_command(events, positions, start, line, position):
+    """Index of the recorded GUI command at or after start that matches line
+
+    "position" and "go" may resync further ahead; a "go" only matches if it
+    searched the same position. Other commands must be the next one recorded.
+    """
+    resync = line.startswith(("position", "go"))
+    for j in range(start, len(events)):
+        if events[j][1] != TO_ENGINE:
+            continue
+        if events[j][2] == line and (not line.startswith("go") or positions[j] == position):
+            return j
+        if not resync:
+            return None
+    return None
+
+
+def replay(log_path, speed=1.0):
+    """Act as a UCI engine by playing back the recording at log_path
+
+    Engine output is only sent for a GUI command that matches the recording.
+    When the GUI deviates (other positions, a different search schedule),
+    the replay resyncs on the next recorded "position" or "go" that matches,
+    skipping the recorded output in between. A search the recording does not
+    contain cannot be answered, so the replay stops there.
+    """
+    events = read_recording(log_path)
+    positions = []  # Last recorded "position" command at each event
+    position = None
+    for _, direction, line in events:
+        if direction == TO_ENGINE and line.startswith("position"):
+            position = line
+        positions.append(position)
+
+    i = 0
+    position = None  # Last "position" command from the GUI
+    for line in sys.stdin:
+        line = line.rstrip("\n")
+        received = time.monotonic()
+        if line.startswith("position"):
+            position = line
+
+        j = _find_command(events, positions, i, line, position)
+        if j is None:
+            if line.startswith("go"):
+                print(f"replay: no recorded {line!r} for {position!r}, stopping", file=sys.stderr)
+                return 1
+            print(f"replay: {line!r} is not in the recording", file=sys.stderr)
+            if line == "isready":
+                sys.stdout.write("readyok\n")
+                sys.stdout.flush()
+            elif line == "quit":
+                break
+            continue
+
+        skipped = sum(1 for e in events[i:j] if e[1] == TO_ENGINE)
+        if skipped:
+            print(f"replay: resynced on {line!r}, skipped {skipped} recorded commands", file=sys.stderr)
+        recorded_ms = events[j][0]
+        i = j + 1
+
+        # Answer with the engine lines up to the next GUI command, keeping
+        # their original delays relative to this command
+        while i < len(events) and events[i][1] == FROM_ENGINE:
+            ms, _, reply = events[i]
+            delay = received + (ms - recorded_ms) / 1000 / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            sys.stdout.write(reply + "\n")
+            sys.stdout.flush()
+            i += 1
+
+        if line == "quit":
+            break
+    return 0
+
+
+def latency(log_path):
+    """Return [(go command, ms until bestmove)] for a recording"""
+    results = []
+    pending = None
+    for ms, direction, line in read_recording(log_path):
+        if direction == TO_ENGINE and line.startswith("go"):
+            pending = (line, ms)
+        elif direction == FROM_ENGINE and line.startswith("bestmove") and pending:
+            results.append((pending[0], ms - pending[1]))
+            pending = None
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and replay UCI engine sessions")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("record", help="proxy an engine and record the session")
+    p.add_argument("log", help="recording to write")
+    p.add_argument("engine", nargs="+", help="engine command line (after --)")
+
+    p = sub.add_parser("replay", help="play a recording back as an engine")
+    p.add_argument("log", help="recording to play")
+    p.add_argument("--speed", type=float, default=1.0, help="timing multiplier (2 = twice as fast)")
+
+    p = sub.add_parser("latency", help="summarize go -> bestmove latencies")
+    p.add_argument("log", help="recording to read")
+
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        return record(args.log, args.engine)
+    if args.command == "replay":
+        return replay(args.log, args.speed)
+
+    results = latency(args.log)
+    for go, ms in results:
+        print(f"{ms:10.1f} ms  {go}")
+    if results:
+        total = sum(ms for _, ms in results)
+        print(f"{len(results)} searches, {total:.1f} ms total, {total / len(results):.1f} ms mean")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())